@@ -11,7 +11,8 @@ from sqlalchemy.sql import func
 CREATE TABLE signs (
   id UUID PRIMARY KEY,
   gloss TEXT,
-  exemplar_landmarks JSONB   -- [[543 floats] x N frames]
+  exemplar_landmarks JSONB,  -- [[543 floats] x N frames]
+  exemplar_landmarks_f16 BYTEA  -- float16 [N frames x 63], see app/utils/landmarks.py
 );
 
 CREATE TABLE attempts (
@@ -1,11 +1,307 @@
 """
 Dynamic Time Warping (DTW) implementation for comparing landmark sequences
-"""
 
-# DTW algorithm will be implemented here
-"""
 Key Functions:
 1. calculate_distance: Compare two landmark vectors
 2. dtw_score: Calculate DTW distance between sequences
+   (dtw_score_batch: every attempt x exemplar pair at once, on the GPU if available)
 3. generate_heatmap: Create frame-by-frame difference visualization
-"""
\ No newline at end of file
+"""
+
+import math
+
+import numpy as np
+from numba import cuda, njit, prange
+from scipy.spatial.distance import cdist
+
+from app.utils.landmarks import LANDMARK_DIM
+
+try:
+    import simsimd
+except ImportError:  # SIMD kernels are optional, scipy is the fallback
+    simsimd = None
+
+
+def frames_to_array(frames):
+    """Pack exemplar/attempt frames into a contiguous (N, 63) float32 array.
+
+    Takes the stored frame list ({"landmarks": [[[x, y, z] * 21]], ...}) and
+    keeps the first hand of each frame. Do this once when the sequence is
+    loaded rather than on every distance call.
+    """
+    return np.ascontiguousarray(
+        [frame["landmarks"][0] for frame in frames], dtype=np.float32
+    ).reshape(len(frames), 63)
+
+
+def _as_sequence(X):
+    """Contiguous float32 (N, 63) array; an empty sequence becomes (0, 63)."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    return X.reshape(0, LANDMARK_DIM) if X.size == 0 else X
+
+
+def calculate_distance(A, B):
+    """Pairwise squared Euclidean distance between two landmark sequences.
+
+    A and B are (N, 63) arrays, one row per frame, flattened from the
+    [[x, y, z] * 21] hand landmark structure. Returns the full (len(A), len(B))
+    cost matrix in a single vectorized call, using SimSIMD when available.
+    An empty sequence gives an empty (0, len(B)) or (len(A), 0) matrix.
+    """
+    A = _as_sequence(A)
+    B = _as_sequence(B)
+    # SimSIMD rejects empty collections; scipy handles them
+    if simsimd is not None and len(A) and len(B):
+        return np.asarray(simsimd.cdist(A, B, metric="sqeuclidean"))
+    return cdist(A, B, 'sqeuclidean')
+
+
+@njit(cache=True)
+def _band_width(ns, nt, window):
+    """Sakoe-Chiba half-width; a negative window selects the default.
+
+    Never narrower than |ns - nt|, otherwise the end cell is unreachable.
+    """
+    if window < 0:
+        return max(10, abs(ns - nt) + 5)
+    return max(window, abs(ns - nt))
+
+
+@njit(cache=True)
+def _dtw_fused(A, B, D, window):
+    """Fill the accumulated cost matrix D (padded by one row/column).
+
+    Each frame cost is computed inline from A[i] and B[j] and consumed
+    immediately, so the (ns, nt) cost matrix is never materialized. Only
+    cells with |i - j| <= w are visited; the rest of D stays at +inf.
+    """
+    ns = A.shape[0]
+    nt = B.shape[0]
+    w = _band_width(ns, nt, window)
+    for i in range(ns):
+        for j in range(max(0, i - w), min(nt, i + w + 1)):
+            cost = 0.0
+            for k in range(A.shape[1]):
+                diff = np.float64(A[i, k]) - np.float64(B[j, k])
+                cost += diff * diff
+
+            best = D[i, j + 1]
+            if D[i + 1, j] < best:
+                best = D[i + 1, j]
+            if D[i, j] < best:
+                best = D[i, j]
+            D[i + 1, j + 1] = cost + best
+
+
+@njit(cache=True)
+def _dtw_backtrack(D):
+    """Walk the optimal path back from D[ns, nt].
+
+    Returns (matchidx, length); matchidx is sized to the ns + nt upper bound
+    and filled back to front, so the path is matchidx[-length:].
+    """
+    ns = D.shape[0] - 1
+    nt = D.shape[1] - 1
+    matchidx = np.empty((ns + nt + 2, 2), dtype=np.int32)
+    k = matchidx.shape[0]
+    i, j = ns, nt
+    while i > 0 and j > 0:
+        k -= 1
+        matchidx[k, 0] = i - 1
+        matchidx[k, 1] = j - 1
+        match = D[i - 1, j - 1]
+        insertion = D[i - 1, j]
+        deletion = D[i, j - 1]
+        if match <= insertion and match <= deletion:
+            i -= 1
+            j -= 1
+        elif insertion <= deletion:
+            i -= 1
+        else:
+            j -= 1
+    return matchidx, matchidx.shape[0] - k
+
+
+def dtw_score(A, B, window=None):
+    """DTW distance between two landmark sequences.
+
+    The warping path is limited to a Sakoe-Chiba band of |i - j| <= window
+    frames (default max(10, |ns - nt| + 5)). Returns (distance, path) where
+    path is an (L, 2) int32 array of the (i, j) frame pairs on the optimal
+    warping path. An empty sequence aligns with nothing: (inf, empty path).
+    """
+    A = _as_sequence(A)
+    B = _as_sequence(B)
+    ns, nt = len(A), len(B)
+    if ns == 0 or nt == 0:
+        return np.inf, np.empty((0, 2), dtype=np.int32)
+
+    D = np.full((ns + 1, nt + 1), np.inf)
+    D[0, 0] = 0
+
+    _dtw_fused(A, B, D, -1 if window is None else window)
+    matchidx, length = _dtw_backtrack(D)
+
+    return D[ns, nt], matchidx[matchidx.shape[0] - length:]
+
+
+@njit(parallel=True, cache=True)
+def _dtw_fused_batch(A, a_offsets, B, b_offsets, distances, window):
+    """CPU batch: one (attempt, exemplar) pair per prange iteration.
+
+    The DP inside a pair has an anti-diagonal dependency, so only the pair
+    loop is parallel.
+    """
+    n_exemplars = b_offsets.shape[0] - 1
+    for p in prange(distances.size):
+        a = p // n_exemplars
+        b = p % n_exemplars
+        seq_a = A[a_offsets[a]:a_offsets[a + 1]]
+        seq_b = B[b_offsets[b]:b_offsets[b + 1]]
+
+        if seq_a.shape[0] == 0 or seq_b.shape[0] == 0:
+            distances[a, b] = np.inf
+        else:
+            D = np.full((seq_a.shape[0] + 1, seq_b.shape[0] + 1), np.inf)
+            D[0, 0] = 0
+            _dtw_fused(seq_a, seq_b, D, window)
+            distances[a, b] = D[seq_a.shape[0], seq_b.shape[0]]
+
+
+_THREADS_PER_BLOCK = 128
+_MAX_GRID_Y = 65535  # CUDA's gridDim.y limit; the wavefront puts one pair per y block
+_DP_BUDGET_BYTES = 1 << 30  # device memory for one chunk's float64 DP matrices
+
+
+@cuda.jit
+def _dtw_init(D):
+    """Reset every pair's padded DP matrix: +inf everywhere but D[p, 0, 0] = 0."""
+    x = cuda.grid(1)
+    cells = D.shape[1] * D.shape[2]
+    if x >= D.shape[0] * cells:
+        return
+    p = x // cells
+    r = x % cells
+    D[p, r // D.shape[2], r % D.shape[2]] = 0.0 if r == 0 else math.inf
+
+
+@cuda.jit
+def _dtw_wavefront(A, a_offsets, B, b_offsets, D, pair_start, k, window):
+    """Fill anti-diagonal i + j == k of every pair's padded DP matrix.
+
+    Cells on one anti-diagonal only depend on the previous two, so each
+    thread takes one cell; grid axis y indexes the (attempt, exemplar) pair
+    within the chunk starting at pair_start.
+    """
+    p = cuda.blockIdx.y
+    n_exemplars = b_offsets.shape[0] - 1
+    a = (pair_start + p) // n_exemplars
+    b = (pair_start + p) % n_exemplars
+    a_start = a_offsets[a]
+    b_start = b_offsets[b]
+    ns = a_offsets[a + 1] - a_start
+    nt = b_offsets[b + 1] - b_start
+
+    i = max(1, k - nt) + cuda.blockIdx.x * cuda.blockDim.x + cuda.threadIdx.x
+    j = k - i
+    if i > ns or j < 1:
+        return
+
+    # Sakoe-Chiba band, same rule as _band_width; cells outside stay at +inf
+    w = max(10, abs(ns - nt) + 5) if window < 0 else max(window, abs(ns - nt))
+    if abs(i - j) > w:
+        return
+
+    cost = 0.0
+    for d in range(A.shape[1]):
+        diff = np.float64(A[a_start + i - 1, d]) - np.float64(B[b_start + j - 1, d])
+        cost += diff * diff
+
+    best = D[p, i - 1, j]
+    if D[p, i, j - 1] < best:
+        best = D[p, i, j - 1]
+    if D[p, i - 1, j - 1] < best:
+        best = D[p, i - 1, j - 1]
+    D[p, i, j] = cost + best
+
+
+@cuda.jit
+def _dtw_gather(D, a_offsets, b_offsets, distances, pair_start, n_chunk):
+    """Copy each chunk pair's end cell D[p, ns, nt] into distances[pair_start + p]."""
+    p = cuda.grid(1)
+    if p >= n_chunk:
+        return
+    n_exemplars = b_offsets.shape[0] - 1
+    a = (pair_start + p) // n_exemplars
+    b = (pair_start + p) % n_exemplars
+    ns = a_offsets[a + 1] - a_offsets[a]
+    nt = b_offsets[b + 1] - b_offsets[b]
+    distances[pair_start + p] = D[p, ns, nt] if ns > 0 and nt > 0 else math.inf
+
+
+def _blocks(n):
+    return max(1, (n + _THREADS_PER_BLOCK - 1) // _THREADS_PER_BLOCK)
+
+
+def _pairs_per_chunk(n_pairs, max_ns, max_nt):
+    """How many pairs one GPU pass can hold: within gridDim.y and the DP memory budget."""
+    pair_bytes = (max_ns + 1) * (max_nt + 1) * np.dtype(np.float64).itemsize
+    return max(1, min(n_pairs, _MAX_GRID_Y, _DP_BUDGET_BYTES // pair_bytes))
+
+
+def dtw_score_batch(attempts, exemplars, window=None):
+    """DTW distance for every (attempt, exemplar) pair.
+
+    attempts and exemplars are lists of (N, 63) landmark arrays; window is
+    the Sakoe-Chiba band as in dtw_score, applied per pair. On a CUDA
+    device pairs are filled together in chunks (bounded by gridDim.y and a
+    device memory budget), one kernel launch per anti-diagonal; without one the pairs are spread across CPU threads. Both paths do the
+    DP in float64, like dtw_score, so all three agree. Returns a
+    (len(attempts), len(exemplars)) distance matrix.
+    """
+    attempts = [_as_sequence(a) for a in attempts]
+    exemplars = [_as_sequence(b) for b in exemplars]
+    if not attempts or not exemplars:
+        return np.empty((len(attempts), len(exemplars)))
+
+    a_lengths = np.array([len(a) for a in attempts])
+    b_lengths = np.array([len(b) for b in exemplars])
+    a_offsets = np.concatenate([[0], np.cumsum(a_lengths)])
+    b_offsets = np.concatenate([[0], np.cumsum(b_lengths)])
+    window = -1 if window is None else window
+
+    if not cuda.is_available():
+        distances = np.empty((len(attempts), len(exemplars)))
+        _dtw_fused_batch(np.concatenate(attempts), a_offsets, np.concatenate(exemplars), b_offsets, distances, window)
+        return distances
+
+    max_ns, max_nt = int(a_lengths.max()), int(b_lengths.max())
+    n_pairs = len(attempts) * len(exemplars)
+
+    d_A = cuda.to_device(np.concatenate(attempts))
+    d_B = cuda.to_device(np.concatenate(exemplars))
+    d_a_offsets = cuda.to_device(a_offsets)
+    d_b_offsets = cuda.to_device(b_offsets)
+
+    # The DP matrices only ever live on the device, one chunk of pairs at a
+    # time; just the n_pairs end cells are copied back
+    chunk = _pairs_per_chunk(n_pairs, max_ns, max_nt)
+    d_D = cuda.device_array((chunk, max_ns + 1, max_nt + 1), dtype=np.float64)
+    d_distances = cuda.device_array(n_pairs, dtype=np.float64)
+
+    for pair_start in range(0, n_pairs, chunk):
+        n_chunk = min(chunk, n_pairs - pair_start)
+        _dtw_init[_blocks(d_D.size), _THREADS_PER_BLOCK](d_D)
+
+        # An anti-diagonal holds at most min(ns, nt) cells
+        blocks = (_blocks(min(max_ns, max_nt)), n_chunk)
+        for k in range(2, max_ns + max_nt + 1):
+            _dtw_wavefront[blocks, _THREADS_PER_BLOCK](
+                d_A, d_a_offsets, d_B, d_b_offsets, d_D, pair_start, k, window
+            )
+
+        _dtw_gather[_blocks(n_chunk), _THREADS_PER_BLOCK](
+            d_D, d_a_offsets, d_b_offsets, d_distances, pair_start, n_chunk
+        )
+
+    return d_distances.copy_to_host().reshape(len(attempts), len(exemplars))
@@ -0,0 +1,112 @@
+"""
+Exemplar landmark loading for scoring
+
+Exemplars change rarely, so decoded arrays are kept in-process for a short
+TTL and the float16 blob is shared between workers through Redis when
+REDIS_URL is set. Postgres (signs.exemplar_landmarks_f16, reached through
+SUPABASE_DB_URL) stays the source of truth. Writers call invalidate_exemplar,
+which drops the shared Redis copy; other processes pick up the change once
+their in-process entry expires.
+"""
+
+import logging
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import psycopg2
+
+from app.utils.landmarks import decode_landmarks
+
+try:
+    import redis
+    from redis.exceptions import RedisError
+except ImportError:  # Redis is optional, every miss then goes to Postgres
+    redis = None
+    RedisError = Exception  # never raised: without the package there is no client to call
+
+logger = logging.getLogger(__name__)
+
+EXEMPLAR_CACHE_TTL = 24 * 60 * 60  # seconds, shared Redis copy
+LOCAL_CACHE_TTL = 60  # seconds, decoded in-process copy
+LOCAL_CACHE_SIZE = 256
+
+# sign_id -> (expires_at, landmarks); insertion order is the eviction order
+_local_cache = {}
+
+
+def exemplar_cache_key(sign_id):
+    return f"ex:{sign_id}"
+
+
+@lru_cache(maxsize=1)
+def _get_redis():
+    redis_url = os.getenv('REDIS_URL')
+    if redis is None or not redis_url:
+        return None
+    return redis.Redis.from_url(redis_url)
+
+
+def _redis_call(command, *args, **kwargs):
+    """Run one Redis command; None when Redis is not configured or unreachable.
+
+    The shared copy is only an optimization, so a Redis outage degrades to
+    Postgres reads instead of failing the scoring request.
+    """
+    cache = _get_redis()
+    if cache is None:
+        return None
+    try:
+        return getattr(cache, command)(*args, **kwargs)
+    except RedisError as e:
+        logger.warning("Exemplar cache %s failed, falling back to Postgres: %s", command, e)
+        return None
+
+
+def _fetch_from_pg(sign_id):
+    """Read the float16 exemplar blob for a sign from Postgres"""
+    conn = psycopg2.connect(os.environ['SUPABASE_DB_URL'])
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT exemplar_landmarks_f16 FROM signs WHERE id = %s", (str(sign_id),))
+            row = cur.fetchone()
+    finally:
+        conn.close()
+
+    if row is None or row[0] is None:
+        raise LookupError(f"No float16 exemplar landmarks stored for sign {sign_id}")
+    return bytes(row[0])
+
+
+def load_exemplar(sign_id):
+    """Exemplar landmarks for a sign as a read-only (N, 63) float32 array.
+
+    The array is decoded at most once per LOCAL_CACHE_TTL per process and
+    shared between requests, so callers must not modify it.
+    """
+    now = time.monotonic()
+    entry = _local_cache.get(sign_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+
+    key = exemplar_cache_key(sign_id)
+    blob = _redis_call('get', key)
+    if blob is None:
+        blob = _fetch_from_pg(sign_id)
+        _redis_call('set', key, blob, ex=EXEMPLAR_CACHE_TTL)
+
+    landmarks = decode_landmarks(blob).astype(np.float32)
+    landmarks.flags.writeable = False
+
+    _local_cache.pop(sign_id, None)
+    if len(_local_cache) >= LOCAL_CACHE_SIZE:
+        _local_cache.pop(next(iter(_local_cache)), None)
+    _local_cache[sign_id] = (now + LOCAL_CACHE_TTL, landmarks)
+    return landmarks
+
+
+def invalidate_exemplar(sign_id):
+    """Drop a sign's cached exemplar after its landmarks are updated"""
+    _local_cache.pop(sign_id, None)
+    _redis_call('delete', exemplar_cache_key(sign_id))
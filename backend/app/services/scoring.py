@@ -0,0 +1,19 @@
+"""
+Scoring of student attempts against stored exemplars
+
+Key Functions:
+1. score_attempt: DTW distance of an attempt to its sign's cached exemplar
+"""
+
+from app.services.dtw import dtw_score, frames_to_array
+from app.services.exemplars import load_exemplar
+
+
+def score_attempt(sign_id, attempt_frames, window=None):
+    """DTW distance and warping path between an attempt and the sign's exemplar.
+
+    attempt_frames is the stored frame list ({"landmarks": [[[x, y, z] * 21]], ...});
+    the exemplar comes from load_exemplar, so repeated attempts at the same
+    sign reuse one decoded array. Returns (distance, path) as dtw_score does.
+    """
+    return dtw_score(frames_to_array(attempt_frames), load_exemplar(sign_id), window=window)
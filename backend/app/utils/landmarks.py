@@ -0,0 +1,22 @@
+"""
+Compact binary encoding for landmark sequences
+
+Exemplar landmarks are stored in signs.exemplar_landmarks_f16 as raw
+little-endian float16 bytes, one row of 63 values (21 landmarks x (x, y, z))
+per frame.
+"""
+
+import numpy as np
+
+LANDMARK_DIM = 63
+LANDMARK_DTYPE = np.dtype('<f2')  # fixed byte order, whatever the host's
+
+
+def encode_landmarks(frames):
+    """Encode an (N, 63) landmark array (or [[x, y, z] * 21] per frame) as float16 bytes"""
+    return np.asarray(frames, dtype=LANDMARK_DTYPE).reshape(-1, LANDMARK_DIM).tobytes()
+
+
+def decode_landmarks(blob):
+    """Decode a BYTEA blob back into an (N, 63) float16 array"""
+    return np.frombuffer(blob, dtype=LANDMARK_DTYPE).reshape(-1, LANDMARK_DIM)
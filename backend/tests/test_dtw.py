@@ -0,0 +1,184 @@
+"""
+Tests for app/services/dtw.py against a plain NumPy reference DP
+"""
+
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from scipy.spatial.distance import cdist
+
+from app.services import dtw
+from app.services.dtw import _pairs_per_chunk, calculate_distance, dtw_score, dtw_score_batch
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def reference_dtw(A, B, window):
+    """Textbook O(ns * nt) DTW over squared Euclidean frame costs, float64."""
+    A = np.asarray(A, dtype=np.float64)
+    B = np.asarray(B, dtype=np.float64)
+    ns, nt = len(A), len(B)
+    D = np.full((ns + 1, nt + 1), np.inf)
+    D[0, 0] = 0
+    for i in range(ns):
+        for j in range(nt):
+            if abs(i - j) <= window:
+                cost = ((A[i] - B[j]) ** 2).sum()
+                D[i + 1, j + 1] = cost + min(D[i, j + 1], D[i + 1, j], D[i, j])
+    return D[ns, nt]
+
+
+def random_sequence(rng, n):
+    return rng.random((n, 63), dtype=np.float32)
+
+
+SHAPES = [(1, 1), (1, 20), (5, 7), (30, 30), (40, 80), (100, 60)]
+
+
+@pytest.mark.parametrize("ns,nt", SHAPES)
+def test_default_band_matches_reference(ns, nt):
+    rng = np.random.default_rng(ns * 1000 + nt)
+    A, B = random_sequence(rng, ns), random_sequence(rng, nt)
+
+    distance, _ = dtw_score(A, B)
+
+    expected = reference_dtw(A, B, window=max(10, abs(ns - nt) + 5))
+    np.testing.assert_allclose(distance, expected, rtol=1e-9)
+
+
+@pytest.mark.parametrize("ns,nt", SHAPES)
+def test_full_window_matches_unconstrained_reference(ns, nt):
+    rng = np.random.default_rng(ns * 1000 + nt + 1)
+    A, B = random_sequence(rng, ns), random_sequence(rng, nt)
+
+    distance, _ = dtw_score(A, B, window=max(ns, nt))
+
+    np.testing.assert_allclose(distance, reference_dtw(A, B, window=max(ns, nt)), rtol=1e-9)
+
+
+def test_narrow_window_is_widened_to_length_difference():
+    rng = np.random.default_rng(7)
+    A, B = random_sequence(rng, 10), random_sequence(rng, 16)
+
+    distance, _ = dtw_score(A, B, window=0)
+
+    assert np.isfinite(distance)
+    np.testing.assert_allclose(distance, reference_dtw(A, B, window=6), rtol=1e-9)
+
+
+@pytest.mark.parametrize("ns,nt", SHAPES)
+def test_path_is_a_valid_warping_path_with_the_returned_cost(ns, nt):
+    rng = np.random.default_rng(ns * 1000 + nt + 2)
+    A, B = random_sequence(rng, ns), random_sequence(rng, nt)
+
+    distance, path = dtw_score(A, B)
+
+    assert path.dtype == np.int32
+    assert path[0].tolist() == [0, 0]
+    assert path[-1].tolist() == [ns - 1, nt - 1]
+    steps = np.diff(path, axis=0)
+    assert ((steps == [0, 1]) | (steps == [1, 0]) | (steps == [1, 1])).all(axis=1).all()
+
+    costs = ((A[path[:, 0]].astype(np.float64) - B[path[:, 1]]) ** 2).sum(axis=1)
+    np.testing.assert_allclose(costs.sum(), distance, rtol=1e-9)
+
+
+@pytest.mark.parametrize("window", [None, 3])
+def test_batch_matches_pairwise_scores(window):
+    rng = np.random.default_rng(11)
+    attempts = [random_sequence(rng, n) for n in (10, 25, 40)]
+    exemplars = [random_sequence(rng, n) for n in (12, 30)]
+
+    distances = dtw_score_batch(attempts, exemplars, window=window)
+
+    expected = [[dtw_score(a, b, window=window)[0] for b in exemplars] for a in attempts]
+    assert distances.shape == (3, 2)
+    np.testing.assert_array_equal(distances, expected)
+
+
+def test_batch_matches_pairwise_scores_on_cuda_simulator():
+    # The simulator has to be enabled before numba is imported, so run in a fresh interpreter
+    script = textwrap.dedent("""
+        import numpy as np
+        from numba import cuda
+        from app.services import dtw
+        from app.services.dtw import dtw_score, dtw_score_batch
+
+        assert cuda.is_available()
+        rng = np.random.default_rng(13)
+        attempts = [rng.random((n, 63), dtype=np.float32) for n in (6, 11, 0)]
+        exemplars = [rng.random((n, 63), dtype=np.float32) for n in (9, 4)]
+
+        def check():
+            for window in (None, 2):
+                distances = dtw_score_batch(attempts, exemplars, window=window)
+                expected = [[dtw_score(a, b, window=window)[0] for b in exemplars] for a in attempts]
+                np.testing.assert_array_equal(distances, expected)
+
+        check()
+        assert dtw_score_batch([], exemplars).shape == (0, 2)
+
+        # 6 pairs split across chunks, by the grid limit (4 + 2) and by the memory budget (1 each)
+        dtw._MAX_GRID_Y = 4
+        check()
+        dtw._DP_BUDGET_BYTES = 1
+        check()
+    """)
+    env = {**os.environ, "NUMBA_ENABLE_CUDASIM": "1"}
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+@pytest.mark.parametrize("use_simsimd", [True, False])
+@pytest.mark.parametrize("ns,nt", [(5, 7), (1, 30), (0, 7), (5, 0)])
+def test_calculate_distance_matches_scipy(monkeypatch, use_simsimd, ns, nt):
+    if use_simsimd and dtw.simsimd is None:
+        pytest.skip("simsimd is not installed")
+    if not use_simsimd:
+        monkeypatch.setattr(dtw, "simsimd", None)
+    rng = np.random.default_rng(ns * 100 + nt)
+    A, B = random_sequence(rng, ns), random_sequence(rng, nt)
+
+    distances = calculate_distance(A, B)
+
+    assert distances.shape == (ns, nt)
+    np.testing.assert_allclose(distances, cdist(A, B, "sqeuclidean"), rtol=1e-5)
+
+
+def test_pairs_per_chunk_respects_grid_and_memory_limits():
+    # 300 x 300 short pairs: bounded by gridDim.y
+    assert _pairs_per_chunk(300 * 300, 20, 20) == 65535
+    # 50k pairs of ~150 frames: bounded by the 1 GiB DP budget
+    assert _pairs_per_chunk(50_000, 150, 150) == (1 << 30) // (151 * 151 * 8)
+    # small batches fit whole, and one oversized pair still gets a chunk
+    assert _pairs_per_chunk(6, 40, 80) == 6
+    assert _pairs_per_chunk(10, 100_000, 100_000) == 1
+
+
+def test_empty_sequence_has_no_alignment():
+    B = random_sequence(np.random.default_rng(17), 5)
+
+    for A, B_ in (([], B), (B, []), ([], [])):
+        distance, path = dtw_score(A, B_)
+        assert distance == np.inf
+        assert path.shape == (0, 2)
+
+
+def test_batch_with_empty_inputs():
+    rng = np.random.default_rng(19)
+    exemplars = [random_sequence(rng, 5), np.empty((0, 63), dtype=np.float32)]
+
+    assert dtw_score_batch([], exemplars).shape == (0, 2)
+    assert dtw_score_batch(exemplars, []).shape == (2, 0)
+
+    distances = dtw_score_batch([random_sequence(rng, 4), []], exemplars)
+    assert np.isfinite(distances[0, 0])
+    assert np.isinf(distances[0, 1]) and np.isinf(distances[1]).all()
@@ -0,0 +1,134 @@
+"""
+Tests for the exemplar cache in app/services/exemplars.py
+
+Postgres, Redis and the clock are stubbed, so no services are needed.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.services import exemplars
+from app.utils.landmarks import encode_landmarks
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def set(self, key, value, ex=None):
+        self.store[key] = value
+        self.ttls[key] = ex
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+
+class DownRedis:
+    def __getattr__(self, command):
+        def fail(*args, **kwargs):
+            raise RedisConnectionError("Connection refused")
+        return fail
+
+
+def blob(value, frames=4):
+    return encode_landmarks(np.full((frames, 63), value, dtype=np.float32))
+
+
+@pytest.fixture
+def env(monkeypatch):
+    """Empty local cache, a fake clock, Redis and Postgres stubs."""
+    state = SimpleNamespace(now=1000.0, redis=FakeRedis(), pg={}, pg_reads=[])
+
+    def fetch_from_pg(sign_id):
+        state.pg_reads.append(sign_id)
+        return state.pg[sign_id]
+
+    monkeypatch.setattr(exemplars, '_local_cache', {})
+    monkeypatch.setattr(exemplars, 'time', SimpleNamespace(monotonic=lambda: state.now))
+    monkeypatch.setattr(exemplars, '_get_redis', lambda: state.redis)
+    monkeypatch.setattr(exemplars, '_fetch_from_pg', fetch_from_pg)
+    return state
+
+
+def test_miss_reads_postgres_and_fills_redis(env):
+    env.pg['a'] = blob(1.0)
+
+    landmarks = exemplars.load_exemplar('a')
+
+    assert landmarks.shape == (4, 63) and landmarks.dtype == np.float32
+    assert not landmarks.flags.writeable
+    assert (landmarks == 1.0).all()
+    assert env.pg_reads == ['a']
+    assert env.redis.store['ex:a'] == env.pg['a']
+    assert env.redis.ttls['ex:a'] == exemplars.EXEMPLAR_CACHE_TTL
+
+
+def test_redis_hit_skips_postgres(env):
+    env.redis.set('ex:a', blob(2.0))
+
+    assert (exemplars.load_exemplar('a') == 2.0).all()
+    assert env.pg_reads == []
+
+
+def test_local_copy_is_reused_until_the_ttl_expires(env):
+    env.pg['a'] = blob(1.0)
+    first = exemplars.load_exemplar('a')
+
+    env.redis.set('ex:a', blob(3.0))
+    env.now += exemplars.LOCAL_CACHE_TTL - 1
+    assert exemplars.load_exemplar('a') is first
+
+    env.now += 1
+    assert (exemplars.load_exemplar('a') == 3.0).all()
+    assert env.pg_reads == ['a']
+
+
+def test_oldest_entry_is_evicted_when_full(env, monkeypatch):
+    monkeypatch.setattr(exemplars, 'LOCAL_CACHE_SIZE', 2)
+    env.pg.update(a=blob(1.0), b=blob(2.0), c=blob(3.0))
+
+    for sign_id in 'abc':
+        exemplars.load_exemplar(sign_id)
+
+    assert list(exemplars._local_cache) == ['b', 'c']
+
+
+def test_invalidate_drops_local_and_redis_copies(env):
+    env.pg['a'] = blob(1.0)
+    exemplars.load_exemplar('a')
+    env.pg['a'] = blob(5.0)
+
+    exemplars.invalidate_exemplar('a')
+
+    assert 'a' not in exemplars._local_cache
+    assert 'ex:a' not in env.redis.store
+    assert (exemplars.load_exemplar('a') == 5.0).all()
+
+
+def test_unreachable_redis_falls_back_to_postgres(env):
+    env.redis = DownRedis()
+    env.pg['a'] = blob(1.0)
+
+    assert (exemplars.load_exemplar('a') == 1.0).all()
+    assert env.pg_reads == ['a']
+    exemplars.invalidate_exemplar('a')
+    assert 'a' not in exemplars._local_cache
+
+
+def test_without_redis_every_miss_goes_to_postgres(env):
+    env.redis = None
+    env.pg['a'] = blob(1.0)
+
+    exemplars.load_exemplar('a')
+    env.now += exemplars.LOCAL_CACHE_TTL
+    exemplars.load_exemplar('a')
+
+    assert env.pg_reads == ['a', 'a']
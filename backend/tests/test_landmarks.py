@@ -0,0 +1,43 @@
+"""
+Tests for the float16 exemplar blob format in app/utils/landmarks.py
+"""
+
+import numpy as np
+
+from app.utils.landmarks import LANDMARK_DIM, decode_landmarks, encode_landmarks
+
+
+def test_round_trip_keeps_shape_and_float16_precision():
+    frames = np.random.default_rng(0).random((12, 21, 3), dtype=np.float32)
+
+    blob = encode_landmarks(frames)
+    decoded = decode_landmarks(blob)
+
+    assert len(blob) == 12 * LANDMARK_DIM * 2
+    assert decoded.shape == (12, LANDMARK_DIM)
+    np.testing.assert_array_equal(decoded, frames.reshape(12, LANDMARK_DIM).astype(np.float16))
+    np.testing.assert_allclose(decoded, frames.reshape(12, LANDMARK_DIM), atol=5e-4)
+
+
+def test_accepts_nested_frame_lists():
+    frames = [[[0.25, 0.5, -0.125]] * 21] * 3
+
+    decoded = decode_landmarks(encode_landmarks(frames))
+
+    np.testing.assert_array_equal(decoded, np.tile([0.25, 0.5, -0.125], (3, 21)))
+
+
+def test_blob_is_little_endian():
+    frames = np.zeros((1, LANDMARK_DIM), dtype=np.float32)
+    frames[0, 0] = 1.0  # float16 1.0 is 0x3C00
+
+    blob = encode_landmarks(frames)
+
+    assert blob[:2] == b'\x00\x3c'
+    assert decode_landmarks(b'\x00\x3c' + bytes(2 * (LANDMARK_DIM - 1)))[0, 0] == 1.0
+
+
+def test_empty_sequence_round_trips():
+    decoded = decode_landmarks(encode_landmarks(np.empty((0, LANDMARK_DIM))))
+
+    assert decoded.shape == (0, LANDMARK_DIM)
@@ -0,0 +1,10 @@
+-- Migration: Add compact binary exemplar landmarks
+-- Stores exemplar frames as raw float16 bytes ([N frames x 63] = 21 landmarks x (x, y, z))
+-- alongside the JSONB column, so the scorer can decode straight into a NumPy array
+-- instead of parsing ~15 ASCII bytes per float
+
+ALTER TABLE signs
+  ADD COLUMN IF NOT EXISTS exemplar_landmarks_f16 BYTEA;
+
+COMMENT ON COLUMN signs.exemplar_landmarks_f16 IS
+  'float16 little-endian landmark matrix, reshape(-1, 63); JSONB exemplar_landmarks keeps timestamps/handedness';
@@ -0,0 +1,18 @@
+-- Migration: Make sure exemplar landmarks are stored as JSONB
+-- JSONB is parsed once on write, so reads are cheaper than with JSON. Every setup
+-- script already creates the column as JSONB; the type change only runs on a
+-- database that still has it as JSON, since it rewrites the table under an
+-- ACCESS EXCLUSIVE lock
+
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_name = 'signs'
+      AND column_name = 'exemplar_landmarks'
+      AND data_type <> 'jsonb'
+  ) THEN
+    ALTER TABLE signs
+      ALTER COLUMN exemplar_landmarks TYPE JSONB USING exemplar_landmarks::jsonb;
+  END IF;
+END $$;
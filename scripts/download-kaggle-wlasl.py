@@ -9,27 +9,64 @@ import sys
 import json
 import zipfile
 import requests
-import cv2
-import mediapipe as mp
 import numpy as np
 from pathlib import Path
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, repeat
 
-# Setup MediaPipe
-mp_hands = mp.solutions.hands
+from wlasl_common import (
+    ensure_hand_landmarker_model,
+    extract_landmarks_from_video,
+    get_landmarker,
+    encode_landmarks,
+    invalidate_exemplar_cache,
+)
+
+try:
+    import ahocorasick
+except ImportError:  # pyahocorasick is optional, substring tests are the fallback
+    ahocorasick = None
+
+def build_sign_matcher(signs):
+    """Compile the filename variants of every sign into a single-pass matcher
+
+    Returns a function mapping a lower-case filename to the set of signs it
+    mentions (Aho-Corasick automaton, or plain substring tests without pyahocorasick).
+    """
+    variants = {}
+    for sign in signs:
+        for variant in (sign.replace(' ', '_'), sign.replace(' ', '')):
+            variants[variant] = sign
+    
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for variant, sign in variants.items():
+            automaton.add_word(variant, sign)
+        automaton.make_automaton()
+        return lambda filename: {sign for _, sign in automaton.iter(filename)}
+    
+    # One substring test per variant, so nested variants ('no' in 'nothing') all
+    # match exactly as they do through the automaton
+    return lambda filename: {sign for variant, sign in variants.items() if variant in filename}
 
 class KaggleWLASLProcessor:
-    def __init__(self, supabase_url=None, supabase_key=None):
-        self.hands = mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
-        )
+    def __init__(self, supabase_url=None, supabase_key=None, database_url=None):
         self.supabase_url = supabase_url
         self.supabase_key = supabase_key
+        self.database_url = database_url
+        
+        # One persistent connection reused for every Supabase REST update
+        self.session = requests.Session()
+        if supabase_key:
+            self.session.headers.update({
+                'apikey': supabase_key,
+                'Authorization': f'Bearer {supabase_key}',
+                'Content-Type': 'application/json',
+                'Prefer': 'return=representation'
+            })
         
         # Target signs we want to process
         self.target_signs = [
@@ -91,20 +128,34 @@ class KaggleWLASLProcessor:
         
         target_videos = {}
         
-        # Look for video files in the downloaded data
+        # Look for video files in the downloaded data, letting the glob filter by
+        # extension; rglob is case-sensitive, so each letter becomes a [xX] class
+        # (matches any casing, e.g. .Mp4, and yields every file exactly once)
         video_extensions = ['.mp4', '.avi', '.mov', '.webm']
+        video_files = chain.from_iterable(
+            self.data_dir.rglob('*' + ''.join(
+                f'[{c}{c.upper()}]' if c.isalpha() else c for c in extension
+            ))
+            for extension in video_extensions
+        )
         
-        for video_file in self.data_dir.rglob('*'):
-            if video_file.suffix.lower() in video_extensions:
-                # Extract sign name from filename
-                filename = video_file.stem.lower()
-                
-                # Check if this video is for one of our target signs
-                for target_sign in self.target_signs:
-                    if target_sign.replace(' ', '_') in filename or target_sign.replace(' ', '') in filename:
-                        print(f"  ✅ Found {target_sign.upper()}: {video_file}")
-                        target_videos[target_sign] = str(video_file)
-                        break
+        match_signs = build_sign_matcher(self.target_signs)
+        remaining = set(self.target_signs)
+        for video_file in video_files:
+            # Extract sign names from filename in one pass
+            hits = match_signs(video_file.stem.lower()) & remaining
+            
+            # Check if this video is for one of the signs still missing
+            for target_sign in self.target_signs:
+                if target_sign in hits:
+                    print(f"  ✅ Found {target_sign.upper()}: {video_file}")
+                    target_videos[target_sign] = str(video_file)
+                    remaining.discard(target_sign)
+                    break
+            
+            # Stop walking the dataset once every sign has a video
+            if not remaining:
+                break
         
         # If no videos found, look for JSON metadata that might point to videos
         if not target_videos:
@@ -121,82 +172,6 @@ class KaggleWLASLProcessor:
         print(f"📊 Found {len(target_videos)} target video files")
         return target_videos
     
-    def extract_landmarks_from_video(self, video_path, sign_name):
-        """Extract hand landmarks from video using MediaPipe"""
-        print(f"🔍 Extracting landmarks for {sign_name.upper()}...")
-        
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"  ❌ Cannot open video: {video_path}")
-            return None
-        
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = frame_count / fps if fps > 0 else 0
-        
-        print(f"  📹 Video: {frame_count} frames, {fps:.1f} FPS, {duration:.1f}s")
-        
-        landmarks_data = {
-            "startTime": 0,
-            "endTime": int(duration * 1000),
-            "duration": int(duration * 1000),
-            "frames": []
-        }
-        
-        frame_idx = 0
-        processed_frames = 0
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            # Process every 3rd frame (30fps -> 10fps)
-            if frame_idx % 3 == 0:
-                timestamp = int((frame_idx / fps) * 1000) if fps > 0 else frame_idx * 33
-                
-                # Convert BGR to RGB for MediaPipe
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.hands.process(rgb_frame)
-                
-                if results.multi_hand_landmarks:
-                    # Take the first hand
-                    hand_landmarks = results.multi_hand_landmarks[0]
-                    handedness = results.multi_handedness[0].classification[0].label if results.multi_handedness else "Right"
-                    confidence = results.multi_handedness[0].classification[0].score if results.multi_handedness else 0.9
-                    
-                    # Extract landmark coordinates
-                    landmarks = []
-                    for landmark in hand_landmarks.landmark:
-                        landmarks.append([landmark.x, landmark.y, landmark.z])
-                    
-                    frame_data = {
-                        "timestamp": timestamp,
-                        "landmarks": [landmarks],  # Wrap in array for consistency
-                        "handedness": [handedness],
-                        "confidence": confidence
-                    }
-                    
-                    landmarks_data["frames"].append(frame_data)
-                    processed_frames += 1
-            
-            frame_idx += 1
-        
-        cap.release()
-        
-        if processed_frames > 0:
-            print(f"  ✅ Extracted {processed_frames} frames with landmarks")
-            
-            # Save landmarks to file
-            landmarks_file = self.landmarks_dir / f"{sign_name}.json"
-            with open(landmarks_file, 'w') as f:
-                json.dump(landmarks_data, f, indent=2)
-            
-            return landmarks_data
-        else:
-            print(f"  ❌ No landmarks detected in {sign_name}")
-            return None
-    
     def create_synthetic_landmarks(self, sign_name):
         """Create synthetic landmarks if video processing fails"""
         print(f"🎨 Creating synthetic landmarks for {sign_name.upper()}...")
@@ -211,6 +186,7 @@ class KaggleWLASLProcessor:
             "duration": duration,
             "frames": []
         }
+        coords = np.empty((frame_count, 21, 3), dtype=np.float32)
         
         for i in range(frame_count):
             timestamp = int((i / frame_count) * duration)
@@ -236,6 +212,7 @@ class KaggleWLASLProcessor:
                 
                 landmarks.append([base_x, base_y, base_z])
             
+            coords[i] = landmarks
             frame_data = {
                 "timestamp": timestamp,
                 "landmarks": [landmarks],
@@ -248,12 +225,12 @@ class KaggleWLASLProcessor:
         # Save landmarks to file
         landmarks_file = self.landmarks_dir / f"{sign_name}.json"
         with open(landmarks_file, 'w') as f:
-            json.dump(landmarks_data, f, indent=2)
+            json.dump(landmarks_data, f, separators=(',', ':'))
         
         print(f"  ✅ Created {frame_count} synthetic frames")
-        return landmarks_data
+        return landmarks_data, coords
     
-    def update_supabase(self, sign_name, landmarks_data, source='kaggle_wlasl'):
+    def update_supabase(self, sign_name, landmarks_data, coords, source='kaggle_wlasl'):
         """Update Supabase with landmark data"""
         if not self.supabase_url or not self.supabase_key:
             print("  ⚠️ No Supabase credentials, skipping database update")
@@ -262,60 +239,74 @@ class KaggleWLASLProcessor:
         print(f"💾 Updating database for {sign_name.upper()}...")
         
         try:
-            import subprocess
-            import tempfile
-            
-            # Create a temporary Node.js script to update Supabase
-            update_script = f"""
-const {{ createClient }} = require('@supabase/supabase-js');
-
-const supabase = createClient('{self.supabase_url}', '{self.supabase_key}');
-
-async function updateSign() {{
-  const landmarksData = {json.dumps(landmarks_data)};
-  
-  const {{ data, error }} = await supabase
-    .from('signs')
-    .update({{
-      exemplar_landmarks: landmarksData,
-      exemplar_source: '{source}',
-      exemplar_quality: 0.90,
-      updated_at: new Date().toISOString()
-    }})
-    .eq('gloss', '{sign_name.upper()}')
-    .select();
-  
-  if (error) {{
-    console.error('❌ Update failed:', error);
-    process.exit(1);
-  }} else {{
-    console.log('✅ Updated {sign_name.upper()} in database');
-    console.log('📊 Frames:', landmarksData.frames.length);
-    process.exit(0);
-  }}
-}}
-
-updateSign();
-"""
-            
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False) as f:
-                f.write(update_script)
-                temp_script = f.name
-            
-            result = subprocess.run(['node', temp_script], capture_output=True, text=True)
-            os.unlink(temp_script)
+            # PATCH through the Supabase REST API: the payload travels as a JSON body
+            # and is never interpolated into source code
+            payload = {
+                'exemplar_landmarks': landmarks_data,
+                # Postgres bytea hex literal, decoded server-side into exemplar_landmarks_f16
+                'exemplar_landmarks_f16': '\\x' + encode_landmarks(coords).hex(),
+                'exemplar_source': source,
+                'exemplar_quality': 0.90,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }
+            response = self.session.patch(
+                f"{self.supabase_url}/rest/v1/signs",
+                params={'gloss': f"eq.{sign_name.upper()}", 'select': 'id'},
+                data=json.dumps(payload, separators=(',', ':')),
+                timeout=30
+            )
             
-            if result.returncode == 0:
+            if response.ok:
                 print(f"  ✅ Database updated for {sign_name}")
+                invalidate_exemplar_cache([row['id'] for row in response.json()])
                 return True
             else:
-                print(f"  ❌ Database update failed: {result.stderr}")
+                print(f"  ❌ Database update failed: {response.status_code} {response.text}")
                 return False
                 
         except Exception as e:
             print(f"  ❌ Database update error: {e}")
             return False
     
+    def update_database(self, updates):
+        """Push all landmark updates to Postgres in a single batched UPDATE"""
+        print(f"💾 Updating database for {len(updates)} signs in one batch...")
+        
+        try:
+            import psycopg2
+            from psycopg2.extras import execute_values
+            
+            rows = [
+                (sign_name.upper(), json.dumps(landmarks_data, separators=(',', ':')),
+                 psycopg2.Binary(encode_landmarks(coords)), source)
+                for sign_name, landmarks_data, coords, source in updates
+            ]
+            
+            conn = psycopg2.connect(self.database_url)
+            try:
+                with conn, conn.cursor() as cur:
+                    updated = execute_values(cur, """
+                        UPDATE signs SET
+                          exemplar_landmarks = data.lm::jsonb,
+                          exemplar_landmarks_f16 = data.f16,
+                          exemplar_source = data.src,
+                          exemplar_quality = 0.90,
+                          updated_at = NOW()
+                        FROM (VALUES %s) AS data(gloss, lm, f16, src)
+                        WHERE signs.gloss = data.gloss
+                        RETURNING signs.id
+                    """, rows, fetch=True)
+            finally:
+                conn.close()
+            
+            invalidate_exemplar_cache([sign_id for (sign_id,) in updated])
+            print(f"  ✅ Database updated for {len(updated)} signs")
+            return len(updated)
+            
+        except Exception as e:
+            print(f"  ❌ Database update error: {e}")
+            return 0
+    
     def process_all_signs(self):
         """Main processing pipeline"""
         print("🚀 Starting Kaggle WLASL processing...")
@@ -328,29 +319,53 @@ updateSign();
             # Find target videos
             target_videos = self.find_target_videos()
         
-        success_count = 0
+        signs_with_video = [sign for sign in self.target_signs if sign in target_videos]
+        
+        # Fetch the model once here rather than racing downloads in pool workers,
+        # and only when there is something to extract
+        if signs_with_video:
+            try:
+                ensure_hand_landmarker_model()
+            except Exception as e:
+                print(f"⚠️ Hand landmarker model unavailable ({e}), proceeding with synthetic data...")
+                signs_with_video = []
+        
+        # Extract real videos first, one sign per worker process; every worker builds
+        # its own landmarker graph, so never start more than there are videos
+        extracted = {}
+        if signs_with_video:
+            workers = min(os.cpu_count() or 1, len(signs_with_video))
+            with ProcessPoolExecutor(max_workers=workers, initializer=get_landmarker) as executor:
+                extracted = dict(zip(signs_with_video, executor.map(
+                    extract_landmarks_from_video,
+                    [target_videos[sign] for sign in signs_with_video],
+                    signs_with_video,
+                    repeat(self.landmarks_dir)
+                )))
+        
+        updates = []
         
         # Process each target sign
         for sign_name in self.target_signs:
             print(f"\n🔄 Processing {sign_name.upper()}...")
             
-            landmarks_data = None
-            
-            # Try to extract from real video first
-            if sign_name in target_videos:
-                video_path = target_videos[sign_name]
-                landmarks_data = self.extract_landmarks_from_video(video_path, sign_name)
+            extraction = extracted.get(sign_name)
             
             # Fall back to synthetic data if no real video or extraction failed
-            if landmarks_data is None:
-                landmarks_data = self.create_synthetic_landmarks(sign_name)
+            if extraction is None:
+                landmarks_data, coords = self.create_synthetic_landmarks(sign_name)
                 source = 'synthetic_kaggle_fallback'
             else:
+                landmarks_data, coords = extraction
                 source = 'kaggle_wlasl_real'
             
-            # Update database
-            if self.update_supabase(sign_name, landmarks_data, source):
-                success_count += 1
+            updates.append((sign_name, landmarks_data, coords, source))
+        
+        # Update database, in one round-trip when a Postgres connection string is set
+        if self.database_url:
+            success_count = self.update_database(updates)
+        else:
+            success_count = sum(self.update_supabase(*update) for update in updates)
         
         print(f"\n🎉 Processing complete!")
         print(f"📊 Successfully processed {success_count}/{len(self.target_signs)} signs")
@@ -373,13 +388,14 @@ def main():
     # Get Supabase credentials from environment
     supabase_url = os.getenv('VITE_SUPABASE_URL')
     supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('VITE_SUPABASE_ANON_KEY')
+    database_url = os.getenv('SUPABASE_DB_URL')
     
-    if not supabase_url or not supabase_key:
+    if not database_url and (not supabase_url or not supabase_key):
         print("⚠️ Warning: No Supabase credentials found")
-        print("Set VITE_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables")
+        print("Set SUPABASE_DB_URL, or VITE_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables")
         print("Proceeding with landmark extraction only...")
     
-    processor = KaggleWLASLProcessor(supabase_url, supabase_key)
+    processor = KaggleWLASLProcessor(supabase_url, supabase_key, database_url)
     success = processor.process_all_signs()
     
     if success:
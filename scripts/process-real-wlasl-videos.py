@@ -7,30 +7,40 @@ Downloads actual WLASL videos and extracts landmarks using MediaPipe
 import os
 import sys
 import json
+import asyncio
+import multiprocessing
 import requests
+import aiohttp
 import subprocess
-import cv2
-import mediapipe as mp
-import numpy as np
 from pathlib import Path
 import time
-from datetime import datetime
+from datetime import datetime, timezone
 import hashlib
+from concurrent.futures import ProcessPoolExecutor
 
-# Setup MediaPipe
-mp_hands = mp.solutions.hands
-mp_drawing = mp.solutions.drawing_utils
+from wlasl_common import (
+    ensure_hand_landmarker_model,
+    extract_landmarks_from_video,
+    get_landmarker,
+    encode_landmarks,
+    invalidate_exemplar_cache,
+)
 
 class WLASLProcessor:
-    def __init__(self, supabase_url=None, supabase_key=None):
-        self.hands = mp_hands.Hands(
-            static_image_mode=False,
-            max_num_hands=1,
-            min_detection_confidence=0.7,
-            min_tracking_confidence=0.5
-        )
+    def __init__(self, supabase_url=None, supabase_key=None, database_url=None):
         self.supabase_url = supabase_url
         self.supabase_key = supabase_key
+        self.database_url = database_url
+        
+        # One persistent connection reused for every Supabase REST update
+        self.session = requests.Session()
+        if supabase_key:
+            self.session.headers.update({
+                'apikey': supabase_key,
+                'Authorization': f'Bearer {supabase_key}',
+                'Content-Type': 'application/json',
+                'Prefer': 'return=representation'
+            })
         
         # Target signs we want to process
         self.target_signs = [
@@ -58,28 +68,44 @@ class WLASLProcessor:
             "https://raw.githubusercontent.com/dxli94/WLASL/main/WLASL_v0.3.json"
         ]
         
-        wlasl_data = None
-        for metadata_url in possible_urls:
-            try:
-                print(f"  🔍 Trying: {metadata_url}")
-                response = requests.get(metadata_url, timeout=30)
-                response.raise_for_status()
-                
-                wlasl_data = response.json()
-                metadata_file = self.data_dir / 'WLASL_v0.3.json'
-                with open(metadata_file, 'w') as f:
-                    json.dump(wlasl_data, f, indent=2)
-                
-                print(f"✅ Downloaded WLASL metadata: {len(wlasl_data)} signs")
-                return wlasl_data
-                
-            except Exception as e:
-                print(f"  ❌ Failed: {e}")
-                continue
+        print(f"  🔍 Racing {len(possible_urls)} mirrors")
+        wlasl_data = asyncio.run(self.fetch_first_metadata(possible_urls))
+        if wlasl_data is not None:
+            metadata_file = self.data_dir / 'WLASL_v0.3.json'
+            with open(metadata_file, 'w') as f:
+                json.dump(wlasl_data, f, separators=(',', ':'))
+            
+            print(f"✅ Downloaded WLASL metadata: {len(wlasl_data)} signs")
+            return wlasl_data
         
         print("❌ All WLASL metadata URLs failed. Using fallback synthetic data...")
         return self.create_fallback_data()
     
+    async def fetch_first_metadata(self, urls):
+        """Request every metadata URL at once and return the first successful JSON body"""
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=30)) as session:
+            async def fetch(url):
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    # raw.githubusercontent.com serves JSON as text/plain
+                    return await response.json(content_type=None)
+            
+            pending = {asyncio.create_task(fetch(url)) for url in urls}
+            try:
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    succeeded = [task for task in done if task.exception() is None]
+                    for task in done:
+                        if task.exception() is not None:
+                            print(f"  ❌ Failed: {task.exception()}")
+                    if succeeded:
+                        return succeeded[0].result()
+            finally:
+                for task in pending:
+                    task.cancel()
+        
+        return None
+    
     def create_fallback_data(self):
         """Create fallback data when WLASL is unavailable"""
         print("🔄 Creating fallback WLASL-style data structure...")
@@ -138,116 +164,77 @@ class WLASLProcessor:
         print(f"📊 Found {len(target_videos)} target signs")
         return target_videos
     
-    def download_video(self, video_info, sign_name):
-        """Download video using yt-dlp"""
-        print(f"🎥 Downloading video for {sign_name.upper()}...")
-        
-        video_path = self.video_dir / f"{sign_name}.mp4"
-        
-        try:
-            # Use yt-dlp to download video segment
-            cmd = [
-                'yt-dlp',
-                '-f', 'best[height<=480]',  # 480p max for processing speed
-                '--external-downloader', 'ffmpeg',
-                '--external-downloader-args', 
-                f'ffmpeg:-ss {video_info["start_time"]} -t {video_info["end_time"] - video_info["start_time"]}',
-                '-o', str(video_path),
-                video_info['url']
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    async def download_video(self, video_info, sign_name, semaphore):
+        """Download video using yt-dlp, at most semaphore-many at a time"""
+        async with semaphore:
+            print(f"🎥 Downloading video for {sign_name.upper()}...")
             
-            if result.returncode == 0 and video_path.exists():
-                print(f"  ✅ Downloaded {sign_name}: {video_path}")
-                return str(video_path)
-            else:
-                print(f"  ❌ Failed to download {sign_name}: {result.stderr}")
-                return None
-                
-        except subprocess.TimeoutExpired:
-            print(f"  ⏱️ Download timeout for {sign_name}")
-            return None
-        except Exception as e:
-            print(f"  ❌ Download error for {sign_name}: {e}")
-            return None
-    
-    def extract_landmarks(self, video_path, sign_name):
-        """Extract hand landmarks from video using MediaPipe"""
-        print(f"🔍 Extracting landmarks for {sign_name.upper()}...")
-        
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"  ❌ Cannot open video: {video_path}")
-            return None
-        
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = frame_count / fps
-        
-        print(f"  📹 Video: {frame_count} frames, {fps:.1f} FPS, {duration:.1f}s")
-        
-        landmarks_data = {
-            "startTime": 0,
-            "endTime": int(duration * 1000),
-            "duration": int(duration * 1000),
-            "frames": []
-        }
-        
-        frame_idx = 0
-        processed_frames = 0
-        
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
+            video_path = self.video_dir / f"{sign_name}.mp4"
             
-            # Process every 3rd frame (30fps -> 10fps)
-            if frame_idx % 3 == 0:
-                timestamp = int((frame_idx / fps) * 1000)
+            try:
+                # Use yt-dlp to download video segment
+                cmd = [
+                    'yt-dlp',
+                    '-f', 'best[height<=480]',  # 480p max for processing speed
+                    '--external-downloader', 'ffmpeg',
+                    '--external-downloader-args', 
+                    f'ffmpeg:-ss {video_info["start_time"]} -t {video_info["end_time"] - video_info["start_time"]}',
+                    '-o', str(video_path),
+                    video_info['url']
+                ]
                 
-                # Convert BGR to RGB for MediaPipe
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = self.hands.process(rgb_frame)
+                process = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+                )
+                try:
+                    _, stderr = await asyncio.wait_for(process.communicate(), timeout=60)
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+                    print(f"  ⏱️ Download timeout for {sign_name}")
+                    return None
                 
-                if results.multi_hand_landmarks:
-                    # Take the first hand
-                    hand_landmarks = results.multi_hand_landmarks[0]
-                    handedness = results.multi_handedness[0].classification[0].label
-                    
-                    # Extract landmark coordinates
-                    landmarks = []
-                    for landmark in hand_landmarks.landmark:
-                        landmarks.append([landmark.x, landmark.y, landmark.z])
-                    
-                    frame_data = {
-                        "timestamp": timestamp,
-                        "landmarks": [landmarks],  # Wrap in array for consistency
-                        "handedness": [handedness],
-                        "confidence": results.multi_handedness[0].classification[0].score
-                    }
+                if process.returncode == 0 and video_path.exists():
+                    print(f"  ✅ Downloaded {sign_name}: {video_path}")
+                    return str(video_path)
+                else:
+                    print(f"  ❌ Failed to download {sign_name}: {stderr.decode(errors='replace')}")
+                    return None
                     
-                    landmarks_data["frames"].append(frame_data)
-                    processed_frames += 1
-            
-            frame_idx += 1
-        
-        cap.release()
+            except Exception as e:
+                print(f"  ❌ Download error for {sign_name}: {e}")
+                return None
+    
+    async def download_and_extract(self, target_videos, extractor):
+        """Download all signs concurrently, extracting each as soon as its video lands"""
+        semaphore = asyncio.Semaphore(4)
+        loop = asyncio.get_running_loop()
         
-        if processed_frames > 0:
-            print(f"  ✅ Extracted {processed_frames} frames with landmarks")
+        async def process_sign(sign_name, video_info):
+            video_path = await self.download_video(video_info, sign_name, semaphore)
+            if not video_path:
+                return None
             
-            # Save landmarks to file
-            landmarks_file = self.landmarks_dir / f"{sign_name}.json"
-            with open(landmarks_file, 'w') as f:
-                json.dump(landmarks_data, f, indent=2)
+            # Extract landmarks
+            extraction = await loop.run_in_executor(
+                extractor, extract_landmarks_from_video, video_path, sign_name, self.landmarks_dir
+            )
             
-            return landmarks_data
-        else:
-            print(f"  ❌ No landmarks detected in {sign_name}")
-            return None
+            # Clean up video file to save space
+            try:
+                os.remove(video_path)
+                print(f"  🗑️ Cleaned up video file for {sign_name}")
+            except:
+                pass
+            
+            return (sign_name, *extraction) if extraction else None
+        
+        results = await asyncio.gather(*(
+            process_sign(sign_name, video_info) for sign_name, video_info in target_videos.items()
+        ))
+        return [result for result in results if result]
     
-    def update_supabase(self, sign_name, landmarks_data):
+    def update_supabase(self, sign_name, landmarks_data, coords):
         """Update Supabase with real landmark data"""
         if not self.supabase_url or not self.supabase_key:
             print("  ⚠️ No Supabase credentials, skipping database update")
@@ -256,60 +243,74 @@ class WLASLProcessor:
         print(f"💾 Updating database for {sign_name.upper()}...")
         
         try:
-            import subprocess
-            import tempfile
-            
-            # Create a temporary Node.js script to update Supabase
-            update_script = f"""
-const {{ createClient }} = require('@supabase/supabase-js');
-const fs = require('fs');
-
-const supabase = createClient('{self.supabase_url}', '{self.supabase_key}');
-
-async function updateSign() {{
-  const landmarksData = {json.dumps(landmarks_data)};
-  
-  const {{ data, error }} = await supabase
-    .from('signs')
-    .update({{
-      exemplar_landmarks: landmarksData,
-      exemplar_source: 'wlasl_real',
-      exemplar_quality: 0.95,
-      updated_at: new Date().toISOString()
-    }})
-    .eq('gloss', '{sign_name.upper()}')
-    .select();
-  
-  if (error) {{
-    console.error('❌ Update failed:', error);
-    process.exit(1);
-  }} else {{
-    console.log('✅ Updated {sign_name.upper()} in database');
-    process.exit(0);
-  }}
-}}
-
-updateSign();
-"""
-            
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False) as f:
-                f.write(update_script)
-                temp_script = f.name
-            
-            result = subprocess.run(['node', temp_script], capture_output=True, text=True)
-            os.unlink(temp_script)
+            # PATCH through the Supabase REST API: the payload travels as a JSON body
+            # and is never interpolated into source code
+            payload = {
+                'exemplar_landmarks': landmarks_data,
+                # Postgres bytea hex literal, decoded server-side into exemplar_landmarks_f16
+                'exemplar_landmarks_f16': '\\x' + encode_landmarks(coords).hex(),
+                'exemplar_source': 'wlasl_real',
+                'exemplar_quality': 0.95,
+                'updated_at': datetime.now(timezone.utc).isoformat()
+            }
+            response = self.session.patch(
+                f"{self.supabase_url}/rest/v1/signs",
+                params={'gloss': f"eq.{sign_name.upper()}", 'select': 'id'},
+                data=json.dumps(payload, separators=(',', ':')),
+                timeout=30
+            )
             
-            if result.returncode == 0:
+            if response.ok:
                 print(f"  ✅ Database updated for {sign_name}")
+                invalidate_exemplar_cache([row['id'] for row in response.json()])
                 return True
             else:
-                print(f"  ❌ Database update failed: {result.stderr}")
+                print(f"  ❌ Database update failed: {response.status_code} {response.text}")
                 return False
                 
         except Exception as e:
             print(f"  ❌ Database update error: {e}")
             return False
     
+    def update_database(self, updates):
+        """Push all landmark updates to Postgres in a single batched UPDATE"""
+        print(f"💾 Updating database for {len(updates)} signs in one batch...")
+        
+        try:
+            import psycopg2
+            from psycopg2.extras import execute_values
+            
+            rows = [
+                (sign_name.upper(), json.dumps(landmarks_data, separators=(',', ':')),
+                 psycopg2.Binary(encode_landmarks(coords)), 'wlasl_real')
+                for sign_name, landmarks_data, coords in updates
+            ]
+            
+            conn = psycopg2.connect(self.database_url)
+            try:
+                with conn, conn.cursor() as cur:
+                    updated = execute_values(cur, """
+                        UPDATE signs SET
+                          exemplar_landmarks = data.lm::jsonb,
+                          exemplar_landmarks_f16 = data.f16,
+                          exemplar_source = data.src,
+                          exemplar_quality = 0.95,
+                          updated_at = NOW()
+                        FROM (VALUES %s) AS data(gloss, lm, f16, src)
+                        WHERE signs.gloss = data.gloss
+                        RETURNING signs.id
+                    """, rows, fetch=True)
+            finally:
+                conn.close()
+            
+            invalidate_exemplar_cache([sign_id for (sign_id,) in updated])
+            print(f"  ✅ Database updated for {len(updated)} signs")
+            return len(updated)
+            
+        except Exception as e:
+            print(f"  ❌ Database update error: {e}")
+            return 0
+    
     def process_all_signs(self):
         """Main processing pipeline"""
         print("🚀 Starting real WLASL video processing...")
@@ -332,32 +333,31 @@ updateSign();
             print("❌ No target videos found")
             return False
         
-        success_count = 0
+        # Fetch the model once here rather than racing downloads in pool workers
+        try:
+            ensure_hand_landmarker_model()
+        except Exception as e:
+            print(f"❌ Could not download the hand landmarker model: {e}")
+            return False
         
-        # Process each sign
-        for sign_name, video_info in target_videos.items():
-            print(f"\n🔄 Processing {sign_name.upper()}...")
-            
-            # Download video
-            video_path = self.download_video(video_info, sign_name)
-            if not video_path:
-                continue
-            
-            # Extract landmarks
-            landmarks_data = self.extract_landmarks(video_path, sign_name)
-            if not landmarks_data:
-                continue
-            
-            # Update database
-            if self.update_supabase(sign_name, landmarks_data):
-                success_count += 1
-            
-            # Clean up video file to save space
-            try:
-                os.remove(video_path)
-                print(f"  🗑️ Cleaned up video file")
-            except:
-                pass
+        # Downloads run concurrently on the event loop; each finished download is handed
+        # straight to a worker process for extraction so the two stages overlap. Every
+        # worker builds its own landmarker graph, so never start more than there are videos.
+        # Workers are started from inside the running event loop, next to asyncio's
+        # subprocess watcher and the executor's own threads, so spawn rather than fork them
+        workers = min(os.cpu_count() or 1, len(target_videos))
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=get_landmarker,
+            mp_context=multiprocessing.get_context('spawn')
+        ) as extractor:
+            updates = asyncio.run(self.download_and_extract(target_videos, extractor))
+        
+        # Update database, in one round-trip when a Postgres connection string is set
+        if self.database_url:
+            success_count = self.update_database(updates)
+        else:
+            success_count = sum(self.update_supabase(*update) for update in updates)
         
         print(f"\n🎉 Processing complete!")
         print(f"📊 Successfully processed {success_count}/{len(target_videos)} signs")
@@ -368,13 +368,14 @@ def main():
     # Get Supabase credentials from environment
     supabase_url = os.getenv('VITE_SUPABASE_URL')
     supabase_key = os.getenv('SUPABASE_SERVICE_ROLE_KEY') or os.getenv('VITE_SUPABASE_ANON_KEY')
+    database_url = os.getenv('SUPABASE_DB_URL')
     
-    if not supabase_url or not supabase_key:
+    if not database_url and (not supabase_url or not supabase_key):
         print("⚠️ Warning: No Supabase credentials found")
-        print("Set VITE_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables")
+        print("Set SUPABASE_DB_URL, or VITE_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY environment variables")
         print("Proceeding with landmark extraction only...")
     
-    processor = WLASLProcessor(supabase_url, supabase_key)
+    processor = WLASLProcessor(supabase_url, supabase_key, database_url)
     success = processor.process_all_signs()
     
     if success:
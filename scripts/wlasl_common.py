@@ -0,0 +1,245 @@
+"""
+Shared MediaPipe landmark extraction for the WLASL import scripts
+
+Used by download-kaggle-wlasl.py and process-real-wlasl-videos.py; both run
+from this directory, so a plain `import wlasl_common` finds it.
+"""
+
+import sys
+import json
+import queue
+import threading
+from functools import lru_cache
+from operator import attrgetter
+from itertools import chain
+from pathlib import Path
+import requests
+import cv2
+import mediapipe as mp
+import numpy as np
+
+# The exemplar blob format lives with the scorer that decodes it
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+from app.utils.landmarks import encode_landmarks
+
+# Setup MediaPipe
+BaseOptions = mp.tasks.BaseOptions
+HandLandmarker = mp.tasks.vision.HandLandmarker
+HandLandmarkerOptions = mp.tasks.vision.HandLandmarkerOptions
+VisionRunningMode = mp.tasks.vision.RunningMode
+
+HAND_LANDMARKER_MODEL = Path('data') / 'models' / 'hand_landmarker.task'
+HAND_LANDMARKER_MODEL_URL = (
+    "https://storage.googleapis.com/mediapipe-models/hand_landmarker/"
+    "hand_landmarker/float16/latest/hand_landmarker.task"
+)
+
+def invalidate_exemplar_cache(sign_ids):
+    """Drop the scorer's cached copies of exemplars that were just updated"""
+    try:
+        from app.services.exemplars import invalidate_exemplar
+        for sign_id in sign_ids:
+            invalidate_exemplar(sign_id)
+    except Exception as e:
+        print(f"  ⚠️ Could not invalidate exemplar cache: {e}")
+
+def ensure_hand_landmarker_model():
+    """Download the MediaPipe hand landmarker model bundle if it is missing"""
+    if not HAND_LANDMARKER_MODEL.exists():
+        print("📥 Downloading MediaPipe hand landmarker model...")
+        HAND_LANDMARKER_MODEL.parent.mkdir(parents=True, exist_ok=True)
+        response = requests.get(HAND_LANDMARKER_MODEL_URL, timeout=60)
+        response.raise_for_status()
+        HAND_LANDMARKER_MODEL.write_bytes(response.content)
+    return str(HAND_LANDMARKER_MODEL)
+
+# Tasks API landmarks are plain dataclasses (no protobuf to decode); one C-level
+# getter per landmark replaces three attribute lookups in a Python generator
+landmark_xyz = attrgetter('x', 'y', 'z')
+
+# Only the palm detector sees the whole (resized) frame; the landmark model runs on
+# a 224px crop of the hand taken from the frame we pass in, so the hand needs to
+# keep enough pixels. 640px leaves WLASL's <=480p videos untouched and only trims
+# HD sources, whose decode and resize cost buys no extra landmark accuracy
+MAX_FRAME_SIDE = 640
+
+def downscale_frame(frame, max_side=MAX_FRAME_SIDE):
+    """Shrink a frame so its longest side is at most max_side (landmarks are normalized)"""
+    h, w = frame.shape[:2]
+    scale = max_side / max(h, w)
+    if scale < 1:
+        frame = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+    return frame
+
+def read_frames(cap, frame_queue, stop, frame_step=3):
+    """Decode every frame_step-th frame on a background thread so decoding overlaps inference
+
+    Skipped frames are only grabbed (demuxed), never decoded. Exits early once
+    the stop event is set.
+    """
+    frame_idx = 0
+    while cap.isOpened() and not stop.is_set():
+        if frame_idx % frame_step != 0:
+            if not cap.grab():
+                break
+            frame_idx += 1
+            continue
+            
+        ret, frame = cap.read()
+        if not ret:
+            break
+        # Downscale and convert BGR to RGB here so both overlap inference on the main thread
+        frame = cv2.cvtColor(downscale_frame(frame), cv2.COLOR_BGR2RGB)
+        frame_queue.put((frame_idx, frame))
+        frame_idx += 1
+    frame_queue.put(None)
+
+# detect_for_video needs monotonically increasing timestamps across videos;
+# timestamp 0 is taken by the warm-up frame
+_timestamp_offset = 1
+
+@lru_cache(maxsize=None)
+def get_landmarker():
+    """Return this process's HandLandmarker, created and warmed up on first use
+
+    One instance per process, so each pool worker builds its own graph once.
+    """
+    # VIDEO mode only re-runs the palm detector when tracking is lost
+    landmarker = HandLandmarker.create_from_options(HandLandmarkerOptions(
+        base_options=BaseOptions(model_asset_path=ensure_hand_landmarker_model()),
+        running_mode=VisionRunningMode.VIDEO,
+        num_hands=1,
+        min_hand_detection_confidence=0.7,
+        min_tracking_confidence=0.5
+    ))
+    
+    # The first inference pays the TFLite delegate init; take it here, not in a video
+    warmup_frame = np.zeros((64, 64, 3), dtype=np.uint8)
+    landmarker.detect_for_video(mp.Image(image_format=mp.ImageFormat.SRGB, data=warmup_frame), 0)
+    return landmarker
+
+def extract_landmarks_from_video(video_path, sign_name, landmarks_dir):
+    """Extract hand landmarks from video using MediaPipe
+    
+    Returns (landmarks_data, coords): the JSON sidecar and the raw
+    (N, 21, 3) float32 coordinates, so callers can encode the float16 blob
+    without walking the JSON frames again. Module-level so it can run in a
+    ProcessPoolExecutor worker.
+    """
+    global _timestamp_offset
+    
+    print(f"🔍 Extracting landmarks for {sign_name.upper()}...")
+    
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        print(f"  ❌ Cannot open video: {video_path}")
+        return None
+    
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    duration = frame_count / fps if fps > 0 else 0
+    
+    print(f"  📹 Video: {frame_count} frames, {fps:.1f} FPS, {duration:.1f}s")
+    
+    landmarks_data = {
+        "startTime": 0,
+        "endTime": int(duration * 1000),
+        "duration": int(duration * 1000),
+        "frames": []
+    }
+    
+    # Preallocated per-frame buffers; CAP_PROP_FRAME_COUNT is only an estimate,
+    # so they grow if it undercounts
+    max_kept = max(frame_count, 0) // 3 + 1
+    coords = np.empty((max_kept, 21, 3), dtype=np.float32)
+    timestamps = np.empty(max_kept, dtype=np.int32)
+    confidences = np.empty(max_kept, dtype=np.float32)
+    handedness_labels = []
+    
+    processed_frames = 0
+    last_timestamp = 0
+    
+    # Decode on a producer thread while MediaPipe runs on this one
+    frame_queue = queue.Queue(maxsize=32)
+    stop = threading.Event()
+    # Process every 3rd frame (30fps -> 10fps)
+    reader = threading.Thread(target=read_frames, args=(cap, frame_queue, stop, 3), daemon=True)
+    reader.start()
+    
+    try:
+        while True:
+            item = frame_queue.get()
+            if item is None:
+                break
+            frame_idx, frame = item
+            
+            timestamp = int((frame_idx / fps) * 1000) if fps > 0 else frame_idx * 33
+            
+            # Frames arrive already in RGB from the reader thread
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame)
+            last_timestamp = timestamp
+            results = get_landmarker().detect_for_video(mp_image, _timestamp_offset + timestamp)
+            
+            if results.hand_landmarks:
+                # Take the first hand
+                hand_landmarks = results.hand_landmarks[0]
+                handedness = results.handedness[0][0].category_name if results.handedness else "Right"
+                confidence = results.handedness[0][0].score if results.handedness else 0.9
+                
+                if processed_frames == len(coords):
+                    coords, timestamps, confidences = (
+                        np.concatenate([buf, np.empty_like(buf)])
+                        for buf in (coords, timestamps, confidences)
+                    )
+                
+                # Extract landmark coordinates straight into the buffer
+                coords[processed_frames] = np.fromiter(
+                    chain.from_iterable(map(landmark_xyz, hand_landmarks)),
+                    dtype=np.float32, count=63
+                ).reshape(21, 3)
+                timestamps[processed_frames] = timestamp
+                confidences[processed_frames] = confidence
+                handedness_labels.append(handedness)
+                processed_frames += 1
+    finally:
+        # Even if inference raised: stop the reader, unblock a pending put by
+        # draining the queue, and only release the capture once it has exited
+        stop.set()
+        while reader.is_alive():
+            try:
+                frame_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        reader.join()
+        cap.release()
+        _timestamp_offset += last_timestamp + 1
+    
+    if processed_frames > 0:
+        print(f"  ✅ Extracted {processed_frames} frames with landmarks")
+        
+        coords = coords[:processed_frames]
+        landmarks_data["frames"] = [
+            {
+                "timestamp": timestamp,
+                "landmarks": [landmarks],  # Wrap in array for consistency
+                "handedness": [handedness],
+                "confidence": confidence
+            }
+            for timestamp, landmarks, handedness, confidence in zip(
+                timestamps[:processed_frames].tolist(),
+                coords.tolist(),
+                handedness_labels,
+                confidences[:processed_frames].tolist()
+            )
+        ]
+        
+        # Save landmarks to file, with the raw coordinate array next to the JSON
+        np.save(landmarks_dir / f"{sign_name}.npy", coords)
+        landmarks_file = landmarks_dir / f"{sign_name}.json"
+        with open(landmarks_file, 'w') as f:
+            json.dump(landmarks_data, f, separators=(',', ':'))
+        
+        return landmarks_data, coords
+    else:
+        print(f"  ❌ No landmarks detected in {sign_name}")
+        return None